@@ -3,14 +3,15 @@
 import sys
 import time
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 from matplotlib.colors import LinearSegmentedColormap
 
 sys.path.insert(0, '/Users/dereckewane/propage')
-sys.setrecursionlimit(5000)
 
-from src.solver import solve_eikonal, warmup as solver_warmup
-from src.raytracer import trace_ray, warmup as ray_warmup
+from src.solver import solve_eikonal
+from src.raytracer import trace_ray
 from src import media
 
 
@@ -22,6 +23,7 @@ def get_colormap():
 
 def visualize_maze_solution(n_field, T, ray, source, target, maze_size, save_path=None):
     fig, axes = plt.subplots(1, 3, figsize=(21, 7), facecolor='#050510')
+    fig.subplots_adjust(left=0.02, right=0.98, bottom=0.04, top=0.86, wspace=0.08)
     
     ax1 = axes[0]
     ax1.set_facecolor('#050510')
@@ -61,10 +63,9 @@ def visualize_maze_solution(n_field, T, ray, source, target, maze_size, save_pat
     
     plt.suptitle(f'Maze Solving via Eikonal Propagation ({maze_size}x{maze_size})', 
                  fontsize=18, color='white', y=0.98, fontweight='bold')
-    plt.tight_layout(rect=[0, 0, 1, 0.95])
     
     if save_path:
-        fig.savefig(save_path, dpi=150, bbox_inches='tight', facecolor='#050510')
+        fig.savefig(save_path, dpi=120, facecolor='#050510', pil_kwargs={'compress_level': 1})
     
     return fig
 
@@ -75,11 +76,6 @@ def run_maze_experiments():
     print("  Finding optimal paths through labyrinths")
     print("=" * 70)
     
-    print("\n[JIT Warmup...]")
-    solver_warmup()
-    ray_warmup()
-    print("Done.\n")
-    
     RES = 600
     maze_sizes = [11, 21, 31, 41, 51]
     
@@ -100,7 +96,7 @@ def run_maze_experiments():
         
         step = RES / 2000
         t0 = time.perf_counter()
-        ray = trace_ray(T, target, source, step=step)
+        ray = trace_ray(T, target, source, step=step, step_max=5*step)
         print(f"  Path traced in: {time.perf_counter() - t0:.3f}s")
         print(f"  Path length: {len(ray)} points")
         
@@ -110,7 +106,7 @@ def run_maze_experiments():
         save_path = f"/Users/dereckewane/propage/results/maze_{ms}x{ms}.png"
         fig = visualize_maze_solution(n_field, T, ray, source, target, ms, save_path)
         print(f"  Saved: results/maze_{ms}x{ms}.png")
-        plt.close(fig)
+        plt.close('all')
     
     print("\n" + "=" * 70)
     print("  ALL MAZES SOLVED!")
@@ -3,33 +3,51 @@
 import sys
 import time
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
+from numba import njit
 
 sys.path.insert(0, '/Users/dereckewane/propage')
-from src.solver import solve_eikonal, warmup as solver_warmup
-from src.raytracer import trace_ray, warmup as ray_warmup
+from src.solver import solve_eikonal
+from src.raytracer import trace_rays
 from src import media
 
 
-def measure_angles(ray, interface_x, margin=80):
-    xc, yc = ray[:, 1], ray[:, 0]
-    crossing = None
+@njit(cache=True)
+def _slope(x, y):
+    xm, ym = x.mean(), y.mean()
+    sxy, sxx = 0.0, 0.0
+    for i in range(len(x)):
+        sxy += (x[i] - xm) * (y[i] - ym)
+        sxx += (x[i] - xm) ** 2
+    return sxy / sxx if sxx > 0 else np.inf
+
+
+@njit(cache=True)
+def _measure_angles(ray, interface_x, margin):
+    xc = ray[:, 1]
+    crossing = -1
     for i in range(len(ray) - 1):
         if (xc[i] > interface_x >= xc[i+1]) or (xc[i] < interface_x <= xc[i+1]):
             crossing = i
             break
-    if crossing is None:
-        return None, None
+    if crossing == -1:
+        return np.nan, np.nan
     pts_m2 = ray[max(0, crossing-margin):crossing]
     pts_m1 = ray[crossing+1:min(len(ray), crossing+1+margin)]
     if len(pts_m2) < 15 or len(pts_m1) < 15:
+        return np.nan, np.nan
+    s2 = _slope(pts_m2[:, 1], pts_m2[:, 0])
+    s1 = _slope(pts_m1[:, 1], pts_m1[:, 0])
+    return np.arctan(abs(s1)), np.arctan(abs(s2))
+
+
+def measure_angles(ray, interface_x, margin=80):
+    t1, t2 = _measure_angles(np.ascontiguousarray(ray, dtype=np.float64), float(interface_x), int(margin))
+    if np.isnan(t1) or np.isnan(t2):
         return None, None
-    try:
-        s2 = np.polyfit(pts_m2[:, 1], pts_m2[:, 0], 1)[0]
-        s1 = np.polyfit(pts_m1[:, 1], pts_m1[:, 0], 1)[0]
-        return np.arctan(abs(s1)), np.arctan(abs(s2))
-    except:
-        return None, None
+    return t1, t2
 
 
 def run_convergence_study():
@@ -38,11 +56,6 @@ def run_convergence_study():
     print("  Classical Eikonal: |nabla T| = n(x,y)")
     print("=" * 75)
     
-    print("\n[JIT Warmup...]")
-    solver_warmup()
-    ray_warmup()
-    print("Done.\n")
-    
     n1, n2 = 1.0, 1.5
     resolutions = [500, 750, 1000, 1500, 2000, 2500, 3000]
     n_rays = 40
@@ -62,7 +75,7 @@ def run_convergence_study():
         n_field = media.planar_diopter(shape, interface_frac=0.5, n1=n1, n2=n2)
         
         t0 = time.perf_counter()
-        T = solve_eikonal(n_field, source)
+        T = solve_eikonal(n_field, source, dtype=np.float64, targets=targets)
         eik_time = time.perf_counter() - t0
         print(f"  Eikonal: {eik_time:.2f}s")
         
@@ -72,8 +85,7 @@ def run_convergence_study():
         errors = []
         angles_data = []
         
-        for target in targets:
-            ray = trace_ray(T, target, source, step=step)
+        for ray in trace_rays(T, targets, source, step=step):
             t1, t2 = measure_angles(ray, interface_x, margin)
             if t1 is not None and t2 is not None and t2 > 0.01:
                 ratio = (n1 * np.sin(t1)) / (n2 * np.sin(t2))
@@ -102,6 +114,7 @@ def run_convergence_study():
             })
     
     fig, axes = plt.subplots(2, 2, figsize=(16, 12), facecolor='#050510')
+    fig.subplots_adjust(left=0.07, right=0.97, bottom=0.06, top=0.91, wspace=0.22, hspace=0.28)
     
     ax1 = axes[0, 0]
     ax1.set_facecolor('#050510')
@@ -183,10 +196,9 @@ def run_convergence_study():
     
     plt.suptitle("Snell-Descartes Law Verification - Convergence Study",
                  fontsize=18, color='white', y=0.98, fontweight='bold')
-    plt.tight_layout(rect=[0, 0, 1, 0.96])
     
     save_path = '/Users/dereckewane/propage/results/snell_convergence.png'
-    fig.savefig(save_path, dpi=150, bbox_inches='tight', facecolor='#050510')
+    fig.savefig(save_path, dpi=120, facecolor='#050510', pil_kwargs={'compress_level': 1})
     print(f"\n-> Saved: results/snell_convergence.png")
     
     print("\n" + "=" * 75)
@@ -195,7 +207,7 @@ def run_convergence_study():
     print(f"  At {results[-1]['res']}x{results[-1]['res']}: error = {results[-1]['mean']:.4f}%")
     print("=" * 75)
     
-    plt.show()
+    plt.close('all')
 
 
 if __name__ == "__main__":
@@ -0,0 +1,25 @@
+"""Ahead-of-time build of the serial hot kernels into src/propage_native.
+
+Run `python -m src._native_build` from the repository root. solver and
+raytracer use the compiled module when it is importable and fall back to
+the @njit kernels otherwise.
+"""
+
+import os
+
+from numba.pycc import CC
+
+from src.solver import _fmm_core
+from src.raytracer import _trace_core
+
+cc = CC('propage_native')
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+cc.target_cpu = 'host'
+
+for name, t in (('f4', 'float32'), ('f8', 'float64')):
+    cc.export(f'fmm_core_{name}', f'{t}[:, ::1]({t}[:, ::1], int64, int64, int64[::1])')(_fmm_core.py_func)
+    cc.export(f'trace_core_{name}', f'UniTuple(float64[:], 2)({t}[:, ::1], float64, float64, float64, float64, float64, int64, float64)')(_trace_core.py_func)
+
+
+if __name__ == '__main__':
+    cc.compile()
@@ -0,0 +1,56 @@
+"""PCG32 random number generator usable inside @njit kernels.
+
+The generator state is a 1-element uint64 array so kernels can advance it in
+place. Constants are np.uint64 throughout: mixing uint64 with Python ints makes
+Numba fall back to float64 arithmetic.
+"""
+
+import numpy as np
+from numba import njit
+
+_MULT = np.uint64(6364136223846793005)
+_INC = np.uint64(1442695040888963407)
+_MASK32 = np.uint64(0xFFFFFFFF)
+
+
+@njit(cache=True)
+def pcg32_next(state):
+    old = state[0]
+    state[0] = old * _MULT + _INC
+    xorshifted = (((old >> np.uint64(18)) ^ old) >> np.uint64(27)) & _MASK32
+    rot = old >> np.uint64(59)
+    return ((xorshifted >> rot) | (xorshifted << ((np.uint64(32) - rot) & np.uint64(31)))) & _MASK32
+
+
+@njit(cache=True)
+def pcg32_seed(seed):
+    state = np.zeros(1, dtype=np.uint64)
+    pcg32_next(state)
+    state[0] += np.uint64(seed)
+    pcg32_next(state)
+    return state
+
+
+@njit(cache=True)
+def pcg32_randn(state):
+    # Box-Muller; u1 is in (0, 1] so the log is finite.
+    u1 = (np.float64(pcg32_next(state)) + 1.0) / 4294967296.0
+    u2 = np.float64(pcg32_next(state)) / 4294967296.0
+    return np.sqrt(-2.0 * np.log(u1)) * np.cos(2.0 * np.pi * u2)
+
+
+@njit(cache=True)
+def pcg32_shuffle4(state, arr4):
+    for i in range(3, 0, -1):
+        j = np.int64(pcg32_next(state) % np.uint64(i + 1))
+        arr4[i], arr4[j] = arr4[j], arr4[i]
+
+
+@njit(cache=True)
+def randn(ny, nx, seed):
+    state = pcg32_seed(seed)
+    out = np.empty((ny, nx))
+    for i in range(ny):
+        for j in range(nx):
+            out[i, j] = pcg32_randn(state)
+    return out
@@ -1,7 +1,13 @@
-"""Refractive index field generators for various media."""
+"""Refractive index field generators for various media.
+
+Every generator returns a C-contiguous float64 array, so solve_eikonal(...,
+dtype=np.float64) hands it to the kernels without copying.
+"""
 
 import numpy as np
-from scipy.ndimage import gaussian_filter
+from numba import njit
+
+from ._rng import pcg32_seed, pcg32_shuffle4, randn
 
 
 def homogeneous(shape, n=1.5):
@@ -52,13 +58,15 @@ def multi_lens(shape, n_lenses=3, n_lens=2.0, n_bg=1.0, radius=0.1):
 
 
 def turbulent(shape, n_min=1.0, n_max=2.5, n_scales=5, seed=42):
-    np.random.seed(seed)
     ny, nx = shape
-    n = np.zeros(shape)
+    k2 = np.fft.fftfreq(ny)[:, np.newaxis]**2 + np.fft.rfftfreq(nx)[np.newaxis, :]**2
+    # Power spectrum of a sum of independent Gaussian-filtered white noises.
+    power = np.zeros(k2.shape)
     for scale in range(n_scales):
         sigma = 2 ** (n_scales - scale - 1) * 5
         amp = 1.0 / (scale + 1)
-        n += amp * gaussian_filter(np.random.randn(ny, nx), sigma=sigma)
+        power += amp**2 * np.exp(-(2*np.pi*sigma)**2 * k2)
+    n = np.fft.irfft2(np.fft.rfft2(randn(ny, nx, seed)) * np.sqrt(power), s=shape)
     n = (n - n.min()) / (n.max() - n.min())
     return (n_min + (n_max - n_min) * n).astype(np.float64)
 
@@ -86,48 +94,69 @@ def complex_structure(shape, seed=123):
     return n
 
 
-def maze(shape, maze_size=15, n_wall=10000.0, n_path=1.0, seed=None):
-    if seed is not None:
-        np.random.seed(seed)
-    
+@njit(cache=True)
+def _open_cell(grid, n, my, mx, cell_h, cell_w, n_path):
+    grid[my, mx] = 0
+    n[my*cell_h:(my+1)*cell_h, mx*cell_w:(mx+1)*cell_w] = n_path
+
+
+@njit(cache=True)
+def _maze_core(ny, nx, maze_size, n_wall, n_path, seed):
     mh, mw = maze_size, maze_size
     grid = np.ones((mh, mw), dtype=np.int8)
-    
-    def carve(cy, cx):
-        grid[cy, cx] = 0
-        dirs = [(0, 2), (0, -2), (2, 0), (-2, 0)]
-        np.random.shuffle(dirs)
-        for dy, dx in dirs:
-            ny, nx = cy + dy, cx + dx
-            if 0 <= ny < mh and 0 <= nx < mw and grid[ny, nx] == 1:
-                grid[cy + dy//2, cx + dx//2] = 0
-                carve(ny, nx)
-    
-    start_y, start_x = 1, 1
-    carve(start_y, start_x)
+    n = np.full((ny, nx), n_wall)
+    cell_h, cell_w = ny // mh, nx // mw
+    state = pcg32_seed(seed)
+    dir_y = np.array([0, 0, 2, -2])
+    dir_x = np.array([2, -2, 0, 0])
+    # Depth-first carving with an explicit stack of (cell, shuffled dirs, next dir).
+    stack_y = np.empty(mh*mw, dtype=np.int64)
+    stack_x = np.empty(mh*mw, dtype=np.int64)
+    stack_d = np.empty((mh*mw, 4), dtype=np.int64)
+    stack_i = np.zeros(mh*mw, dtype=np.int64)
+    _open_cell(grid, n, 1, 1, cell_h, cell_w, n_path)
+    stack_y[0], stack_x[0], stack_d[0] = 1, 1, np.arange(4)
+    pcg32_shuffle4(state, stack_d[0])
+    top = 1
+    while top > 0:
+        k = top - 1
+        cy, cx = stack_y[k], stack_x[k]
+        while stack_i[k] < 4:
+            d = stack_d[k, stack_i[k]]
+            stack_i[k] += 1
+            ny2, nx2 = cy + dir_y[d], cx + dir_x[d]
+            if 0 <= ny2 < mh and 0 <= nx2 < mw and grid[ny2, nx2] == 1:
+                _open_cell(grid, n, cy + dir_y[d]//2, cx + dir_x[d]//2, cell_h, cell_w, n_path)
+                _open_cell(grid, n, ny2, nx2, cell_h, cell_w, n_path)
+                stack_y[top], stack_x[top], stack_d[top], stack_i[top] = ny2, nx2, np.arange(4), 0
+                pcg32_shuffle4(state, stack_d[top])
+                top += 1
+                break
+        else:
+            top -= 1
     
     end_y, end_x = mh - 2, mw - 2
     if grid[end_y, end_x] == 1:
-        grid[end_y, end_x] = 0
-        for dy, dx in [(-1, 0), (0, -1), (1, 0), (0, 1)]:
-            ny, nx = end_y + dy, end_x + dx
-            if 0 <= ny < mh and 0 <= nx < mw and grid[ny, nx] == 0:
+        _open_cell(grid, n, end_y, end_x, cell_h, cell_w, n_path)
+        connected = False
+        for dy, dx in ((-1, 0), (0, -1), (1, 0), (0, 1)):
+            ny2, nx2 = end_y + dy, end_x + dx
+            if 0 <= ny2 < mh and 0 <= nx2 < mw and grid[ny2, nx2] == 0:
+                connected = True
                 break
-        else:
-            grid[end_y - 1, end_x] = 0
-    
+        if not connected:
+            _open_cell(grid, n, end_y - 1, end_x, cell_h, cell_w, n_path)
+    return n
+
+
+def maze(shape, maze_size=15, n_wall=10000.0, n_path=1.0, seed=None):
+    if seed is None:
+        seed = np.random.randint(0, 2**31)
     ny, nx = shape
-    n = np.full(shape, n_wall, dtype=np.float64)
-    
-    cell_h, cell_w = ny // mh, nx // mw
-    for my in range(mh):
-        for mx in range(mw):
-            if grid[my, mx] == 0:
-                y0, y1 = my * cell_h, (my + 1) * cell_h
-                x0, x1 = mx * cell_w, (mx + 1) * cell_w
-                n[y0:y1, x0:x1] = n_path
+    n = _maze_core(ny, nx, maze_size, float(n_wall), float(n_path), seed)
     
-    start_pos = (start_y * cell_h + cell_h // 2, start_x * cell_w + cell_w // 2)
-    end_pos = (end_y * cell_h + cell_h // 2, end_x * cell_w + cell_w // 2)
+    cell_h, cell_w = ny // maze_size, nx // maze_size
+    start_pos = (cell_h + cell_h // 2, cell_w + cell_w // 2)
+    end_pos = ((maze_size - 2) * cell_h + cell_h // 2, (maze_size - 2) * cell_w + cell_w // 2)
     
     return n, start_pos, end_pos
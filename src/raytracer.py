@@ -1,10 +1,12 @@
 """Ray tracing by gradient descent on arrival time field."""
 
 import numpy as np
-from numba import njit
+from numba import njit, prange
 
+from .solver import _JIT, _native
 
-@njit
+
+@njit(**_JIT)
 def _gradient(T, y, x):
     ny, nx = T.shape
     y = max(0.5, min(ny-1.5, y))
@@ -19,36 +21,80 @@ def _gradient(T, y, x):
     return gy, gx
 
 
-@njit
-def _trace_core(T, ty, tx, sy, sx, step, maxs):
+@njit(**_JIT)
+def _trace_into(T, path, ty, tx, sy, sx, step, step_max):
+    # Step length adapts between step and step_max: a step whose end gradient
+    # turns by more than ~11 degrees is retried at half length, and the step
+    # grows again once the direction stays within ~1 degree. Near the source
+    # the step is capped at the remaining distance so the stop radius stays
+    # 2*step.
     ny, nx = T.shape
-    py, px = np.zeros(maxs), np.zeros(maxs)
     y, x = float(ty), float(tx)
-    py[0], px[0] = y, x
+    path[0, 0], path[0, 1] = y, x
     n = 1
-    for _ in range(1, maxs):
-        gy, gx = _gradient(T, y, x)
-        gn = np.sqrt(gy**2 + gx**2)
+    h = step
+    gy, gx = _gradient(T, y, x)
+    gn = np.sqrt(gy**2 + gx**2)
+    for _ in range(1, path.shape[0]):
         if gn < 1e-10: break
-        y -= step * gy / gn
-        x -= step * gx / gn
+        gy0, gx0, gn0 = gy, gx, gn
+        while True:
+            y1, x1 = y - h * gy0 / gn0, x - h * gx0 / gn0
+            gy, gx = _gradient(T, y1, x1)
+            gn = np.sqrt(gy**2 + gx**2)
+            dot = (gy*gy0 + gx*gx0) / gn0
+            if h <= step or (gn >= 1e-10 and dot >= 0.98*gn): break
+            h = max(step, 0.5*h)
+        y, x = y1, x1
         if y < 0 or y >= ny or x < 0 or x >= nx: break
-        py[n], px[n] = y, x
+        path[n, 0], path[n, 1] = y, x
         n += 1
-        if np.sqrt((y-sy)**2 + (x-sx)**2) < step*2: break
-    return py[:n], px[:n]
+        d = np.sqrt((y-sy)**2 + (x-sx)**2)
+        if d < step*2: break
+        if dot > 0.9999*gn: h = min(step_max, 1.5*h)
+        h = min(h, max(step, d - step))
+    return n
+
+
+@njit(**_JIT)
+def _trace_core(T, ty, tx, sy, sx, step, maxs, step_max):
+    path = np.zeros((maxs, 2))
+    n = _trace_into(T, path, ty, tx, sy, sx, step, step_max)
+    return path[:n, 0], path[:n, 1]
+
+
+@njit(parallel=True, **_JIT)
+def _trace_core_batch(T, ty, tx, sy, sx, step, maxs, step_max):
+    paths = np.empty((ty.shape[0], maxs, 2))
+    lens = np.zeros(ty.shape[0], dtype=np.int64)
+    for r in prange(ty.shape[0]):
+        lens[r] = _trace_into(T, paths[r], ty[r], tx[r], sy, sx, step, step_max)
+    return paths, lens
+
+
+_NATIVE_TRACE = {} if _native is None else {np.dtype(np.float32): _native.trace_core_f4,
+                                            np.dtype(np.float64): _native.trace_core_f8}
 
 
-def trace_ray(T, target, source, step=0.5):
-    py, px = _trace_core(T, float(target[0]), float(target[1]),
-                         float(source[0]), float(source[1]), step, 30000)
+def trace_ray(T, target, source, step=0.5, step_max=None):
+    step_max = step if step_max is None else max(step, step_max)
+    core = _NATIVE_TRACE.get(T.dtype, _trace_core) if T.flags.c_contiguous else _trace_core
+    py, px = core(T, float(target[0]), float(target[1]),
+                  float(source[0]), float(source[1]), float(step), 30000, float(step_max))
     return np.column_stack([py, px])
 
 
-def trace_rays(T, targets, source, step=0.5):
-    return [trace_ray(T, t, source, step) for t in targets]
+def trace_rays(T, targets, source, step=0.5, step_max=None):
+    step_max = step if step_max is None else max(step, step_max)
+    ty = np.array([t[0] for t in targets], dtype=np.float64)
+    tx = np.array([t[1] for t in targets], dtype=np.float64)
+    paths, lens = _trace_core_batch(T, ty, tx, float(source[0]), float(source[1]),
+                                    float(step), 30000, float(step_max))
+    return [paths[r, :lens[r]].copy() for r in range(len(lens))]
 
 
 def warmup():
-    T = np.ones((50, 50), dtype=np.float64)
-    _ = trace_ray(T, (40, 40), (25, 5))
+    for dtype in (np.float32, np.float64):
+        T = np.ones((50, 50), dtype=dtype)
+        _ = trace_ray(T, (40, 40), (25, 5))
+        _ = trace_rays(T, [(40, 40)], (25, 5))
@@ -1,68 +1,234 @@
-"""Eikonal equation solver using Fast Marching Method."""
+"""Eikonal equation solver using the Fast Marching and Fast Sweeping Methods."""
+
+import os
 
 import numpy as np
-from numba import njit
+from numba import njit, prange
+
+# LLVM fast-math flags minus 'nnan'/'ninf': unreached points hold np.inf.
+_FASTMATH = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
+_JIT = dict(fastmath=_FASTMATH, boundscheck=False, cache=True)
 
 
-@njit
-def _solve_quadratic(T, slowness, y, x, dx, ny, nx):
-    slow = slowness[y, x]
-    t_horiz, t_vert = np.inf, np.inf
+@njit(**_JIT)
+def _solve_quadratic(T, sdx, y, x, ny, nx):
+    # float32 literals keep float32 fields in float32 and widen exactly otherwise.
+    inf, two = np.float32(np.inf), np.float32(2.0)
+    s = sdx[y, x]
+    t_horiz, t_vert = inf, inf
     if x > 0 and T[y, x-1] < t_horiz: t_horiz = T[y, x-1]
     if x < nx-1 and T[y, x+1] < t_horiz: t_horiz = T[y, x+1]
     if y > 0 and T[y-1, x] < t_vert: t_vert = T[y-1, x]
     if y < ny-1 and T[y+1, x] < t_vert: t_vert = T[y+1, x]
-    t1, t2 = (t_horiz, t_vert) if t_horiz < t_vert else (t_vert, t_horiz)
-    if t1 == np.inf: return np.inf
-    if t2 < np.inf:
-        a, b, c = 2.0, -2*(t1+t2), t1**2 + t2**2 - (slow*dx)**2
-        disc = b*b - 4*a*c
-        if disc >= 0:
-            t_new = (-b + np.sqrt(disc)) / (2*a)
-            if t_new >= t2: return t_new
-    return t1 + slow*dx
-
-
-@njit
-def _fmm_core(slowness, sy, sx, dx):
-    ny, nx = slowness.shape
-    T = np.full((ny, nx), np.inf)
+    t1, t2 = min(t_horiz, t_vert), max(t_horiz, t_vert)
+    if t1 == inf: return inf
+    # Root of 2t^2 - 2(t1+t2)t + t1^2 + t2^2 - s^2 = 0 written in terms of
+    # t2 - t1, avoiding the ~T^2 cancellation of b^2 - 4ac. It is real and
+    # >= t2 exactly when t2 - t1 < s; otherwise the 1-D update applies.
+    d = t2 - t1
+    if d < s:
+        return (t1 + t2 + np.sqrt(two*s*s - d*d)) / two
+    return t1 + s
+
+
+@njit(**_JIT)
+def _heap_push(heap, pos, hs, key, mask):
+    c = key & mask
+    i = pos[c]
+    if i == -1:
+        i, hs = hs, hs + 1
+    while i > 0:
+        p = (i - 1) // 2
+        if heap[p] <= key: break
+        heap[i] = heap[p]
+        pos[heap[i] & mask] = i
+        i = p
+    heap[i] = key
+    pos[c] = i
+    return hs
+
+
+@njit(**_JIT)
+def _heap_pop(heap, pos, hs, mask):
+    key = heap[0]
+    pos[key & mask] = -1
+    hs -= 1
+    if hs == 0: return key, hs
+    last = heap[hs]
+    i = 0
+    while True:
+        c = 2*i + 1
+        if c >= hs: break
+        if c + 1 < hs and heap[c+1] < heap[c]: c += 1
+        if heap[c] >= last: break
+        heap[i] = heap[c]
+        pos[heap[i] & mask] = i
+        i = c
+    heap[i] = last
+    pos[last & mask] = i
+    return key, hs
+
+
+@njit(**_JIT)
+def _fmm_core(sdx, sy, sx, targets):
+    ny, nx = sdx.shape
+    T = np.full((ny, nx), np.inf, dtype=sdx.dtype)
     frozen = np.zeros((ny, nx), dtype=np.bool_)
     T[sy, sx] = 0.0
-    heap_t = np.full(ny*nx, np.inf)
-    heap_y = np.zeros(ny*nx, dtype=np.int32)
-    heap_x = np.zeros(ny*nx, dtype=np.int32)
-    heap_t[0], heap_y[0], heap_x[0] = 0.0, sy, sx
-    hs = 1
+    # Heap keys: high bits of the float64 time (ordered like int64 for t >= 0),
+    # low `shift` bits the flat cell index, whose heap slot is kept in `pos`.
+    shift = 1
+    while (1 << shift) < ny*nx: shift += 1
+    mask = (np.int64(1) << shift) - 1
+    tbuf = np.zeros(1)
+    tbits = tbuf.view(np.int64)
+    heap = np.empty(ny*nx, dtype=np.int64)
+    pos = np.full(ny*nx, -1, dtype=np.int32)
+    hs = _heap_push(heap, pos, 0, np.int64(sy*nx + sx), mask)
     dy_arr = np.array([-1, 1, 0, 0], dtype=np.int32)
     dx_arr = np.array([0, 0, -1, 1], dtype=np.int32)
+    # Once the sorted flat `targets` are frozen, keep going for 2*max(sdx) so
+    # every 2x2 interpolation cell a ray may read is final too.
+    remaining, t_stop = len(targets), np.inf
     while hs > 0:
-        mi, mt = 0, heap_t[0]
-        for i in range(1, hs):
-            if heap_t[i] < mt: mt, mi = heap_t[i], i
-        y, x = heap_y[mi], heap_x[mi]
-        hs -= 1
-        if mi < hs:
-            heap_t[mi], heap_y[mi], heap_x[mi] = heap_t[hs], heap_y[hs], heap_x[hs]
+        key, hs = _heap_pop(heap, pos, hs, mask)
+        c = key & mask
+        y, x = c // nx, c % nx
+        if T[y, x] > t_stop: break
+        frozen[y, x] = True
+        if remaining > 0:
+            i = np.searchsorted(targets, c)
+            if i < len(targets) and targets[i] == c:
+                remaining -= 1
+                if remaining == 0: t_stop = T[y, x] + 2*sdx.max()
+        for d in range(4):
+            ny2, nx2 = y + dy_arr[d], x + dx_arr[d]
+            if 0 <= ny2 < ny and 0 <= nx2 < nx and not frozen[ny2, nx2]:
+                tn = _solve_quadratic(T, sdx, ny2, nx2, ny, nx)
+                if tn < T[ny2, nx2]:
+                    T[ny2, nx2] = tn
+                    tbuf[0] = tn
+                    hs = _heap_push(heap, pos, hs, (tbits[0] & ~mask) | (ny2*nx + nx2), mask)
+    return T
+
+
+@njit(**_JIT)
+def _fmm_bucket_core(sdx, sy, sx):
+    ny, nx = sdx.shape
+    T = np.full((ny, nx), np.inf, dtype=sdx.dtype)
+    frozen = np.zeros((ny, nx), dtype=np.bool_)
+    T[sy, sx] = 0.0
+    dt = sdx.min() / np.sqrt(2.0)
+    nb = int(sdx.max() / dt) + 2
+    head = np.full(nb, -1, dtype=np.int64)
+    cap = ny*nx
+    nxt = np.empty(cap, dtype=np.int64)
+    bk_y = np.empty(cap, dtype=np.int32)
+    bk_x = np.empty(cap, dtype=np.int32)
+    bk_y[0], bk_x[0], nxt[0], head[0] = sy, sx, -1, 0
+    free, top, count, cur = -1, 1, 1, 0
+    dy_arr = np.array([-1, 1, 0, 0], dtype=np.int32)
+    dx_arr = np.array([0, 0, -1, 1], dtype=np.int32)
+    while count > 0:
+        b = cur % nb
+        while head[b] == -1:
+            cur += 1
+            b = cur % nb
+        e = head[b]
+        head[b], nxt[e], free = nxt[e], free, e
+        count -= 1
+        y, x = bk_y[e], bk_x[e]
         if frozen[y, x]: continue
         frozen[y, x] = True
         for d in range(4):
             ny2, nx2 = y + dy_arr[d], x + dx_arr[d]
             if 0 <= ny2 < ny and 0 <= nx2 < nx and not frozen[ny2, nx2]:
-                tn = _solve_quadratic(T, slowness, ny2, nx2, dx, ny, nx)
+                tn = _solve_quadratic(T, sdx, ny2, nx2, ny, nx)
                 if tn < T[ny2, nx2]:
                     T[ny2, nx2] = tn
-                    if hs < ny*nx:
-                        heap_t[hs], heap_y[hs], heap_x[hs] = tn, ny2, nx2
-                        hs += 1
+                    if free != -1:
+                        e, free = free, nxt[free]
+                    elif top < cap:
+                        e, top = top, top + 1
+                    else:
+                        continue
+                    b = max(int(tn / dt), cur) % nb
+                    bk_y[e], bk_x[e], nxt[e], head[b] = ny2, nx2, head[b], e
+                    count += 1
     return T
 
 
-def solve_eikonal(n_field, source, dx=1.0):
-    slowness = n_field.astype(np.float64)
-    return _fmm_core(slowness, int(source[0]), int(source[1]), dx)
+@njit(parallel=True, **_JIT)
+def _fss_core(sdx, sy, sx, tol=1e-9, max_iter=100, by=64, bx=256, n_inner=1):
+    ny, nx = sdx.shape
+    T = np.full((ny, nx), np.inf, dtype=sdx.dtype)
+    T[sy, sx] = 0.0
+    nty, ntx = (ny + by - 1) // by, (nx + bx - 1) // bx
+    for _ in range(max_iter):
+        err = 0.0
+        for sweep in range(4):
+            for k in range(nty + ntx - 1):
+                for ti in prange(max(0, k - ntx + 1), min(nty, k + 1)):
+                    tj = k - ti
+                    for _ in range(n_inner):
+                        for ii in range(ti*by, min(ny, (ti+1)*by)):
+                            y = ii if sweep & 1 == 0 else ny-1-ii
+                            for jj in range(tj*bx, min(nx, (tj+1)*bx)):
+                                x = jj if sweep & 2 == 0 else nx-1-jj
+                                tn = _solve_quadratic(T, sdx, y, x, ny, nx)
+                                if tn < T[y, x]:
+                                    err = max(err, T[y, x] - tn)
+                                    T[y, x] = tn
+        if err < tol: break
+    return T
+
+
+_METHODS = {'fmm': _fmm_core, 'bucket': _fmm_bucket_core, 'fsm': _fss_core}
+
+
+def _load_native():
+    # AOT kernels from src/_native_build.py, skipped if older than their sources.
+    try:
+        from . import propage_native
+    except ImportError:
+        return None
+    here = os.path.dirname(os.path.abspath(__file__))
+    built = os.path.getmtime(propage_native.__file__)
+    if any(os.path.getmtime(os.path.join(here, f)) > built for f in ('solver.py', 'raytracer.py')):
+        return None
+    return propage_native
+
+
+_native = _load_native()
+_NATIVE_FMM = {} if _native is None else {np.dtype(np.float32): _native.fmm_core_f4,
+                                          np.dtype(np.float64): _native.fmm_core_f8}
+
+
+def solve_eikonal(n_field, source, dx=1.0, method='fmm', dtype=np.float32, targets=None):
+    """method='fmm' uses an exact binary heap; method='bucket' an untidy
+    bucket queue (Dial), O(N) but with a small ordering error inside each bucket;
+    method='fsm' Gauss-Seidel sweeps in the 4 quadrant orderings until T stops
+    changing, best for smooth, low-contrast media (not mazes).
+    T is computed in `dtype`; pass np.float64 where sub-ulp accuracy matters.
+    With `targets` (fmm only), marching stops once they and a band around them
+    are frozen; T is then only final up to that arrival time."""
+    if method not in _METHODS:
+        raise ValueError(f"unknown method {method!r}, expected one of {sorted(_METHODS)}")
+    # The kernels take slowness already scaled by the grid step.
+    sdx = np.ascontiguousarray(n_field, dtype=dtype)
+    if dx != 1.0:
+        sdx = sdx * sdx.dtype.type(dx)
+    sy, sx = int(source[0]), int(source[1])
+    if method != 'fmm':
+        if targets is not None:
+            raise ValueError(f"targets are only supported with method='fmm', not {method!r}")
+        return _METHODS[method](sdx, sy, sx)
+    nx = sdx.shape[1]
+    flat = np.unique(np.array([int(t[0])*nx + int(t[1]) for t in (targets if targets is not None else ())], dtype=np.int64))
+    return _NATIVE_FMM.get(sdx.dtype, _fmm_core)(sdx, sy, sx, flat)
 
 
 def warmup():
     w = np.ones((50, 50), dtype=np.float64)
-    _ = solve_eikonal(w, (25, 5))
+    for dtype in (np.float32, np.float64):
+        _ = solve_eikonal(w, (25, 5), dtype=dtype)
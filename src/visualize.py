@@ -24,15 +24,14 @@ def plot_medium(ax, n_field, source=None, title=""):
 
 def plot_arrival_time(ax, T, source=None, n_contours=20, title=""):
     ax.set_facecolor('#050510')
-    T_plot = np.ma.masked_invalid(T)
-    T_plot = np.ma.masked_where(T_plot > 1e10, T_plot)
+    mask = ~np.isfinite(T) | (T > 1e10)
+    T_plot = np.ma.array(T, mask=mask)
     im = ax.imshow(T_plot, cmap=get_colormap(), origin='lower', interpolation='bilinear')
     ny, nx = T.shape
-    X, Y = np.meshgrid(np.arange(nx), np.arange(ny))
-    T_valid = T[np.isfinite(T) & (T < 1e10)]
+    T_valid = T[~mask]
     if len(T_valid) > 0:
         levels = np.linspace(T_valid.min(), T_valid.max() * 0.92, n_contours)
-        ax.contour(X, Y, T_plot, levels=levels, colors='white', linewidths=0.4, alpha=0.6)
+        ax.contour(np.arange(nx), np.arange(ny), T_plot, levels=levels, colors='white', linewidths=0.4, alpha=0.6)
     if source:
         ax.plot(source[1], source[0], 'w*', markersize=20, markeredgecolor='red', markeredgewidth=2)
     ax.set_title(title, fontsize=14, color='white', pad=10)
@@ -42,8 +41,7 @@ def plot_arrival_time(ax, T, source=None, n_contours=20, title=""):
 
 def plot_rays(ax, T, rays, source, targets, n_field=None, title=""):
     ax.set_facecolor('#050510')
-    T_plot = np.ma.masked_invalid(T)
-    T_plot = np.ma.masked_where(T_plot > 1e10, T_plot)
+    T_plot = np.ma.array(T, mask=~np.isfinite(T) | (T > 1e10))
     if n_field is not None:
         ax.imshow(n_field, cmap='viridis', origin='lower', alpha=0.5)
     else:
@@ -64,6 +62,7 @@ def plot_rays(ax, T, rays, source, targets, n_field=None, title=""):
 
 def create_experiment_figure(n_field, T, rays, source, targets, name, save_path=None):
     fig, axes = plt.subplots(1, 3, figsize=(20, 7), facecolor='#050510')
+    fig.subplots_adjust(left=0.03, right=0.98, bottom=0.05, top=0.88, wspace=0.12)
     plot_medium(axes[0], n_field, source, "Refractive Index n(x,y)")
     plot_arrival_time(axes[1], T, source, 25, "Arrival Time T(x,y)")
     plot_rays(axes[2], T, rays, source, targets, n_field, "Ray Tracing")
@@ -73,7 +72,6 @@ def create_experiment_figure(n_field, T, rays, source, targets, name, save_path=
             cbar.ax.yaxis.set_tick_params(color='white')
             plt.setp(cbar.ax.get_yticklabels(), color='white')
     plt.suptitle(name, fontsize=18, color='white', y=0.98, fontweight='bold')
-    plt.tight_layout(rect=[0, 0, 1, 0.95])
     if save_path:
-        fig.savefig(save_path, dpi=150, bbox_inches='tight', facecolor='#050510')
+        fig.savefig(save_path, dpi=120, facecolor='#050510', pil_kwargs={'compress_level': 1})
     return fig